@@ -0,0 +1,40 @@
+from typing import List, Optional
+import random
+from models import Player, Role
+
+AUTOFILL_DELAY = 60             # seconds a short lobby waits before bots take the free seats
+IDLE_PHASES_FOR_AUTOPILOT = 2   # voting phases a player may skip before a bot plays for them
+BOT_NAME = "🤖 Բոտ {}"
+
+MAFIA_ROLES = [Role.MAFIA, Role.DON]
+
+
+def bot_telegram_id(game_id: int, seat: int) -> int:
+    """Synthetic identity for a bot seat. Real Telegram user ids are positive,
+    so negative ids can never collide with a human player."""
+    return -(game_id * 100 + seat)
+
+
+def is_bot_player(telegram_id: int) -> bool:
+    return telegram_id < 0
+
+
+class BotPolicy:
+    """Cheap role-aware decisions for bot seats and players on autopilot"""
+
+    def night_target(self, player: Player, players: List[Player]) -> Optional[Player]:
+        alive = [p for p in players if p.is_alive and p.id != player.id]
+        if player.current_role in MAFIA_ROLES:
+            # Mafia kills and the don checks outside their own team
+            candidates = [p for p in alive if p.current_role not in MAFIA_ROLES]
+        elif player.current_role == Role.LAWYER:
+            candidates = [p for p in alive if p.current_role in MAFIA_ROLES]
+        else:
+            candidates = alive
+        return random.choice(candidates) if candidates else None
+
+    def vote_target(self, player: Player, players: List[Player]) -> Optional[Player]:
+        alive = [p for p in players if p.is_alive and p.id != player.id]
+        if player.current_role in MAFIA_ROLES:
+            alive = [p for p in alive if p.current_role not in MAFIA_ROLES] or alive
+        return random.choice(alive) if alive else None
@@ -0,0 +1,262 @@
+"""Micro-benchmarks for the game engine's core operations.
+
+Runs GameManager against an in-memory SQLite database and a fake bot,
+reports time and SQL query counts per call and compares them with a stored
+baseline:
+
+    python benchmarks.py                   # run and compare with the baseline
+    python benchmarks.py --save-baseline   # run and store the results as the new baseline
+
+Query and API call counts do not depend on the machine, so their baseline is
+kept in the repository and any increase fails the run. Timings do, so they
+are only checked against a baseline recorded on the same machine:
+
+    python benchmarks.py --time-baseline bench_times.json --save-baseline
+    python benchmarks.py --time-baseline bench_times.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', 'benchmark')
+
+from sqlalchemy import event
+
+import game_manager
+from database import Base, engine, get_db
+from game_manager import GameManager
+from models import Action, ActionType, Player, Role
+from outbox import FanOutSender
+
+PLAYER_COUNTS = [4, 8, 12, 20]
+GAME_COUNTS = [1, 10, 100, 1000]
+BASELINE_FILE = 'benchmarks_baseline.json'
+COUNT_FIELDS = ('queries_per_call', 'api_calls_per_call')
+TIME_TOLERANCE = 0.25  # allowed slowdown relative to the baseline
+BENCHMARK_SEND_RATE = 1e9  # the fake bot has no Telegram rate limit
+
+
+class FakeMessage:
+    def __init__(self, chat_id: int):
+        self.chat_id = chat_id
+
+    def edit_text(self, *args, **kwargs):
+        return self
+
+
+class FakeBot:
+    """Counts API calls; messages are sent from the sender's worker threads"""
+
+    def __init__(self):
+        self.api_calls = 0
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text=None, **kwargs):
+        with self.lock:
+            self.api_calls += 1
+        return FakeMessage(chat_id)
+
+
+class FakeJobQueue:
+    """Accepts jobs without running them, phases are driven by the benchmark"""
+
+    def run_once(self, callback, when, context=None, **kwargs):
+        return None
+
+    def run_repeating(self, callback, interval, **kwargs):
+        return None
+
+
+class FakeContext:
+    def __init__(self):
+        self.bot = FakeBot()
+        self.job_queue = FakeJobQueue()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def measure(calls: List[Callable], counter: QueryCounter, context: FakeContext,
+            sender: FanOutSender) -> Dict[str, float]:
+    queries_before = counter.count
+    api_before = context.bot.api_calls
+    started = time.perf_counter()
+    for call in calls:
+        call()
+    # Sends are asynchronous; the operation is done once its messages are out
+    sender.wait()
+    elapsed = time.perf_counter() - started
+    n = max(len(calls), 1)
+    return {
+        'ms_per_call': elapsed * 1000 / n,
+        'queries_per_call': (counter.count - queries_before) / n,
+        'api_calls_per_call': (context.bot.api_calls - api_before) / n,
+    }
+
+
+def seed_night_actions(game_ids: List[int]) -> None:
+    db = next(get_db())
+    for game_id in game_ids:
+        players = db.query(Player).filter(Player.game_id == game_id).all()
+        for player in players:
+            action_type = {
+                Role.MAFIA: ActionType.KILL,
+                Role.DON: ActionType.CHECK,
+                Role.DOCTOR: ActionType.HEAL,
+                Role.COMMISSIONER: ActionType.CHECK,
+                Role.LAWYER: ActionType.PROTECT,
+            }.get(player.current_role)
+            if action_type:
+                db.add(Action(
+                    game_id=game_id,
+                    player_id=player.id,
+                    target_id=random.choice(players).id,
+                    action_type=action_type,
+                    night_number=1,
+                    result=True
+                ))
+    db.commit()
+
+
+def seed_votes(manager: GameManager, game_ids: List[int]) -> None:
+    db = next(get_db())
+    for game_id in game_ids:
+        players = db.query(Player).filter(Player.game_id == game_id).all()
+        manager.player_votes[game_id] = {
+            p.id: random.choice(players).telegram_id for p in players
+        }
+
+
+def run_case(num_players: int, num_games: int, counter: QueryCounter) -> Dict[str, Dict[str, float]]:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    sender = FanOutSender(rate=BENCHMARK_SEND_RATE)
+    manager = GameManager(sender=sender)
+    context = FakeContext()
+    chat_ids = [-(1000 + i) for i in range(num_games)]
+    games = [manager.create_game(chat_id) for chat_id in chat_ids]
+    game_ids = [game.id for game in games]
+
+    results = {}
+    results['add_player'] = measure([
+        (lambda g=game.id, t=game.id * 100 + seat: manager.add_player(g, t, f"player{t}"))
+        for game in games for seat in range(num_players)
+    ], counter, context, sender)
+    results['assign_roles'] = measure([
+        (lambda g=game_id: manager.assign_roles(g)) for game_id in game_ids
+    ], counter, context, sender)
+
+    for chat_id in chat_ids:
+        manager.active_games[chat_id].status = game_manager.GameStatus.ACTIVE
+    results['start_night_phase'] = measure([
+        (lambda c=chat_id: manager.start_night_phase(c, context)) for chat_id in chat_ids
+    ], counter, context, sender)
+
+    seed_night_actions(game_ids)
+    results['process_night_actions'] = measure([
+        (lambda g=game_id: manager.process_night_actions(g)) for game_id in game_ids
+    ], counter, context, sender)
+
+    seed_votes(manager, game_ids)
+    results['process_votes'] = measure([
+        (lambda g=game_id: manager.process_votes(g)) for game_id in game_ids
+    ], counter, context, sender)
+    results['check_game_end'] = measure([
+        (lambda g=game_id: manager.check_game_end(g)) for game_id in game_ids
+    ], counter, context, sender)
+    return results
+
+
+def run_all(player_counts: List[int], game_counts: List[int]) -> Dict[str, Dict[str, float]]:
+    counter = QueryCounter()
+    results = {}
+    for num_games in game_counts:
+        for num_players in player_counts:
+            random.seed(num_players * 1000 + num_games)
+            for op, stats in run_case(num_players, num_games, counter).items():
+                results[f"{op}/players={num_players}/games={num_games}"] = stats
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> List[str]:
+    """Reports every count that grew and every time beyond TIME_TOLERANCE;
+    fields missing from the baseline are not checked."""
+    regressions = []
+    for key, stats in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for field in COUNT_FIELDS:
+            if field in base and stats[field] > base[field]:
+                regressions.append(f"{key}: {field} {base[field]:.1f} -> {stats[field]:.1f}")
+        if 'ms_per_call' in base and stats['ms_per_call'] > base['ms_per_call'] * (1 + TIME_TOLERANCE):
+            regressions.append(
+                f"{key}: time {base['ms_per_call']:.3f}ms -> {stats['ms_per_call']:.3f}ms"
+            )
+    return regressions
+
+
+def select_fields(results: Dict[str, Dict[str, float]], fields) -> Dict[str, Dict[str, float]]:
+    return {key: {field: stats[field] for field in fields} for key, stats in results.items()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--players', type=int, nargs='+', default=PLAYER_COUNTS)
+    parser.add_argument('--games', type=int, nargs='+', default=GAME_COUNTS)
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="query and API call counts")
+    parser.add_argument('--time-baseline', help="per-machine timings, not checked unless given")
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    # The benchmark covers lobbies up to 20 players, like config.MAX_PLAYERS
+    game_manager.MAX_PLAYERS = max(game_manager.MAX_PLAYERS, max(args.players))
+
+    results = run_all(args.players, args.games)
+
+    print(f"{'operation':<50} {'ms/call':>10} {'queries':>8} {'api':>6}")
+    for key, stats in results.items():
+        print(
+            f"{key:<50} {stats['ms_per_call']:>10.3f} "
+            f"{stats['queries_per_call']:>8.1f} {stats['api_calls_per_call']:>6.1f}"
+        )
+
+    baselines = [(args.baseline, COUNT_FIELDS)]
+    if args.time_baseline:
+        baselines.append((args.time_baseline, ('ms_per_call',)))
+
+    if args.save_baseline:
+        for path, fields in baselines:
+            with open(path, 'w') as f:
+                json.dump(select_fields(results, fields), f, indent=2, sort_keys=True)
+            print(f"Baseline saved to {path}")
+        return 0
+
+    regressions = []
+    for path, fields in baselines:
+        if not os.path.exists(path):
+            print(f"No baseline at {path}, run with --save-baseline to create one")
+            continue
+        with open(path) as f:
+            regressions.extend(compare(results, json.load(f)))
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,31 +1,39 @@
 import asyncio
+import functools
 import logging
+from typing import Optional
 from telegram.ext import (
     Updater,
     CommandHandler,
     CallbackQueryHandler,
-    CallbackContext
+    MessageHandler,
+    Filters,
+    CallbackContext,
+    JobQueue
 )
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from game_manager import GameManager
+from game_manager import GameManager, SWEEP_INTERVAL
+from matchmaking import MATCHMAKING_INTERVAL
+from throttle import BUCKET_IDLE_TTL
 from models import GameStatus, GamePhase, Role
+from outbox import FanOutSender
 from messages import MESSAGES
-from config import TOKEN
+from config import TOKENS, WORKERS, LOG_LEVEL
+from logging_setup import setup_logging
 from database import Base, engine
 
-# Set up logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+# Set up logging: records are queued and written as JSON by a background thread
+setup_logging(getattr(logging, LOG_LEVEL, logging.INFO))
 logger = logging.getLogger(__name__)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
-game_manager = GameManager()
+def bot_id_from_token(token: str) -> int:
+    """The numeric part of a token is the bot's user id"""
+    return int(token.split(':', 1)[0])
 
-def start_command(update: Update, context: CallbackContext) -> None:
+def start_command(game_manager: GameManager, update: Update, context: CallbackContext) -> None:
     """Starts a new game"""
     chat_id = update.effective_chat.id
     game = game_manager.create_game(chat_id)
@@ -33,61 +41,72 @@ def start_command(update: Update, context: CallbackContext) -> None:
     keyboard = [[InlineKeyboardButton("Միանալ", callback_data="join")]]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    context.bot.send_message(
+    message = context.bot.send_message(
         chat_id=chat_id,
-        text=MESSAGES['waiting_for_players'].format(0, 4),
+        text=game_manager.render_lobby(chat_id),
         reply_markup=reply_markup
     )
+    game_manager.lobby_messages[chat_id] = message
 
-def join_callback(update: Update, context: CallbackContext) -> None:
-    """Handles player joining the game"""
-    query = update.callback_query
-    chat_id = query.message.chat_id
-    user_id = query.from_user.id
-    username = query.from_user.username or query.from_user.first_name
-
-    game = game_manager.active_games.get(chat_id)
-    if not game or game.status != GameStatus.WAITING:
-        query.answer(MESSAGES['game_already_started'])
-        return
-
-    try:
-        player = game_manager.add_player(game.id, user_id, username)
-        query.answer(MESSAGES['player_joined'].format(username))
+def build_bot(token: str, sender: FanOutSender, job_queue: Optional[JobQueue] = None) -> Updater:
+    """Creates the updater of one bot with its own GameManager. Phase timers
+    go to the shared job queue when one is given."""
+    game_manager = GameManager(bot_id=bot_id_from_token(token), sender=sender)
+    admission = game_manager.admission
 
-        players_count = len(game.players)
-        if players_count >= 4:  # Минимальное количество игроков
-            game_manager.start_game(chat_id, context)
-        else:
-            keyboard = [[InlineKeyboardButton("Միանալ", callback_data="join")]]
-            query.message.edit_text(
-                MESSAGES['waiting_for_players'].format(players_count, 4),
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-    except Exception as e:
-        logger.error(f"Error adding player: {e}")
-        query.answer(MESSAGES['error_joining'])
-
-def main() -> None:
-    """Starts the bot"""
-    updater = Updater(TOKEN)
+    updater = Updater(token, workers=WORKERS)
     dp = updater.dispatcher
+    if job_queue is not None:
+        # The updater's own job queue is never started, so no extra scheduler thread
+        updater.job_queue = dp.job_queue = job_queue
+    job_queue = updater.job_queue
 
     # Add command handlers
-    dp.add_handler(CommandHandler("start", start_command))
-    dp.add_handler(CallbackQueryHandler(join_callback, pattern="^join$"))
+    dp.add_handler(CommandHandler("start", functools.partial(start_command, game_manager)))
+    dp.add_handler(CommandHandler("queue", game_manager.queue_command))
+    dp.add_handler(CommandHandler("leave_queue", game_manager.leave_queue_command))
+    # Button presses pass the admission layer before any database work
+    dp.add_handler(CallbackQueryHandler(admission.guard(game_manager.join_callback), pattern="^join$"))
     dp.add_handler(CallbackQueryHandler(
-        game_manager.handle_night_action,
+        admission.guard(game_manager.handle_night_action),
         pattern="^night_action_"
     ))
     dp.add_handler(CallbackQueryHandler(
-        game_manager.handle_vote,
+        admission.guard(game_manager.handle_vote),
         pattern="^vote_"
     ))
+    dp.add_handler(MessageHandler(
+        Filters.text & Filters.chat_type.private & ~Filters.command,
+        game_manager.relay_mafia_message
+    ))
+
+    # Resume games interrupted by a restart
+    game_manager.recover_games(dp)
+    # Jobs of a shared queue would get the first bot's context, so periodic
+    # jobs are bound to this bot's dispatcher
+    context = CallbackContext(dp)
+    job_queue.run_repeating(lambda x: game_manager.sweep(context), SWEEP_INTERVAL, first=SWEEP_INTERVAL)
+    job_queue.run_repeating(lambda x: game_manager.run_matchmaker(context), MATCHMAKING_INTERVAL)
+    job_queue.run_repeating(admission.prune, BUCKET_IDLE_TTL, first=BUCKET_IDLE_TTL)
+    return updater
+
+def main() -> None:
+    """Starts every configured bot in this process. The bots share the
+    database engine, the outbound rate limiter and the phase scheduler."""
+    sender = FanOutSender()
+    updaters = []
+    for token in TOKENS:
+        job_queue = updaters[0].job_queue if updaters else None
+        updaters.append(build_bot(token, sender, job_queue))
+    logger.info("Hosting %s bot(s)", len(updaters))
 
-    # Start the bot
-    updater.start_polling()
-    updater.idle()
+    # Start the bots
+    for updater in updaters:
+        updater.start_polling()
+    # idle() stops the first updater on a signal, the others are stopped here
+    updaters[0].idle()
+    for updater in updaters[1:]:
+        updater.stop()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -12,11 +12,23 @@ DB_CONFIG = {
     'password': os.getenv('PGPASSWORD', '')
 }
 
-# Bot configuration
-TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-if not TOKEN:
+# Bot configuration: one process can host several bots, listed comma-separated
+# in TELEGRAM_BOT_TOKENS; a single TELEGRAM_BOT_TOKEN still works
+TOKENS = [t.strip() for t in os.getenv('TELEGRAM_BOT_TOKENS', '').split(',') if t.strip()]
+if not TOKENS and os.getenv('TELEGRAM_BOT_TOKEN'):
+    TOKENS = [os.getenv('TELEGRAM_BOT_TOKEN')]
+if not TOKENS:
     raise ValueError("Telegram bot token not found in environment variables!")
 
+# Dispatcher worker threads per bot; games are serialized per chat, so this can grow with load
+WORKERS = int(os.getenv('BOT_WORKERS', '8'))
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+# The database pool is shared by every hosted bot: one connection per dispatcher
+# worker, plus overflow for the job queue threads
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', str(len(TOKENS) * WORKERS)))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+
 # Game configuration
 MIN_PLAYERS = 4
 MAX_PLAYERS = 20
@@ -1,22 +1,32 @@
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
-from config import DB_CONFIG
+from sqlalchemy.pool import QueuePool, StaticPool
+from config import DB_CONFIG, DB_POOL_SIZE, DB_MAX_OVERFLOW
 from models import Base
 
 DATABASE_URL = os.environ.get('DATABASE_URL') or f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
 
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_pre_ping=True
-)
+if DATABASE_URL.startswith('sqlite'):
+    # Used by benchmarks.py: one shared connection keeps an in-memory database alive
+    engine = create_engine(
+        DATABASE_URL,
+        poolclass=StaticPool,
+        connect_args={'check_same_thread': False}
+    )
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=30,
+        pool_pre_ping=True
+    )
 
-SessionLocal = sessionmaker(bind=engine)
+# Game objects live in GameManager.active_games across phases, so keep
+# their loaded state after commits instead of expiring it
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
 
 def get_db():
     db = SessionLocal()
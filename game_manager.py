@@ -1,13 +1,27 @@
 import asyncio
-from typing import List, Dict
+from typing import List, Dict, Optional, Set
 from datetime import datetime, timedelta
+import sys
+import time
 from models import Game, Player, Action, GameStatus, GamePhase, Role, ActionType
 from database import get_db
 from messages import MESSAGES
 from roles import ROLE_HANDLERS
+from outbox import ChatOutbox, FanOutSender
+from locks import StripedLock, serialized_by
+from logging_setup import log_context, VOTE_LOG_SAMPLE_RATE, NIGHT_CLICK_LOG_SAMPLE_RATE
+from matchmaking import MatchmakingQueue, QueuedPlayer, DEFAULT_LANGUAGE, MATCH_TARGET_SIZE
+from profiles import PlayerProfile, PlayerProfileCache
+from throttle import AdmissionController
+from autofill import (
+    BotPolicy, AUTOFILL_DELAY, IDLE_PHASES_FOR_AUTOPILOT, BOT_NAME, bot_telegram_id, is_bot_player
+)
 import random
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ParseMode
-from telegram.ext import CallbackContext
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ParseMode, Message
+from telegram.ext import CallbackContext, Dispatcher, Job
+from apscheduler.jobstores.base import JobLookupError
+from sqlalchemy import update
+from sqlalchemy.orm import selectinload, object_session
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,28 +34,126 @@ DON_MIN_PLAYERS = 5
 LAWYER_MIN_PLAYERS = 8
 SECOND_DOCTOR_MIN_PLAYERS = 10
 SECOND_COMMISSIONER_MIN_PLAYERS = 10
+LOBBY_UPDATE_INTERVAL = 2  # seconds between lobby message re-renders
+NIGHT_DURATION = 120  # seconds
+DAY_DURATION = 180    # seconds
+VOTING_DURATION = 60  # seconds
+
+# Startup recovery
+RECOVERY_BATCH_SIZE = 500     # games loaded per bulk query
+RECOVERY_TIME_BUDGET = 5.0    # seconds spent recovering before deferring the rest
+RECOVERY_STAGGER = 0.05       # seconds between overdue phase resumptions
+
+# In-memory state lifecycle
+LOBBY_TTL = 30 * 60           # seconds an idle lobby is kept before eviction
+STALLED_GAME_GRACE = 5 * 60   # seconds past the phase deadline before a game counts as stalled
+SWEEP_INTERVAL = 60           # seconds between sweeper runs
+
+# Matched games have no group chat; they get a synthetic chat id below this
+# bound (far beyond real Telegram group ids) and are played over private chats
+VIRTUAL_CHAT_BASE = -10 ** 15
+
+# Game state is mutated from dispatcher worker threads and job queue callbacks;
+# every entry point runs under the lock of the game chat it touches
+per_chat = serialized_by(lambda self, chat_id, *args, **kwargs: chat_id)
+per_update = serialized_by(lambda self, update, *args, **kwargs: self.game_chat_for(update))
+
+
+def is_virtual_chat(chat_id: int) -> bool:
+    return chat_id <= VIRTUAL_CHAT_BASE
+
+
+def cancel_job(job: Optional[Job]) -> None:
+    """Removes a pending one-shot job; one that already ran has left the scheduler"""
+    if job is None or job.removed:
+        return
+    try:
+        job.schedule_removal()
+    except JobLookupError:
+        pass
 
 
 class GameManager:
-    def __init__(self):
+    """Game state of one bot. Several managers can share a process; each
+    reads and writes only the games and players of its own bot_id."""
+
+    def __init__(self, bot_id: Optional[int] = None, sender: Optional[FanOutSender] = None):
+        self.bot_id = bot_id
         self.active_games: Dict[int, Game] = {}
         self.player_votes: Dict[int, Dict[int, int]] = {}
+        # Lobby roster per chat (telegram_id -> username), kept in join order
+        self.lobbies: Dict[int, Dict[int, str]] = {}
+        self.unsaved_joins: Dict[int, Dict[int, str]] = {}
+        self.lobby_messages: Dict[int, Message] = {}
+        self.lobby_flush_pending: Set[int] = set()
         self.role_handlers = ROLE_HANDLERS
+        self.chat_locks = StripedLock()
+        self.outbox = ChatOutbox()
+        # Bots in one process share the sender's workers; each keeps its own send rate
+        self.sender = sender or FanOutSender()
+        # Living mafia members per game chat, used to relay the mafia chat
+        # without hitting the database on every message
+        self.mafia_members: Dict[int, Set[int]] = {}
+        self.player_chats: Dict[int, int] = {}  # telegram_id -> game chat_id
+        self.last_activity: Dict[int, float] = {}  # chat_id -> time.monotonic()
+        self.matchmaking = MatchmakingQueue()
+        self.virtual_chats: Dict[int, List[int]] = {}  # virtual chat_id -> member telegram ids
+        self.last_virtual_chat_id = VIRTUAL_CHAT_BASE
+        # Turn tracking: pending phase job, who has to act and who has acted
+        self.phase_jobs: Dict[int, Job] = {}
+        self.phase_expected: Dict[int, Set[int]] = {}
+        self.phase_acted: Dict[int, Set[int]] = {}
+        # Bot seats and idle players are played by an in-process policy
+        self.policy = BotPolicy()
+        self.idle_strikes: Dict[int, Dict[int, int]] = {}
+        self.autopilot: Dict[int, Set[int]] = {}
+        self.autofill_jobs: Dict[int, Job] = {}  # chat_id -> pending autofill of its lobby
+        # Button presses are throttled per user and per game chat before reaching the handlers
+        self.admission = AdmissionController(self.phase_key, self.game_chat_for)
+        # Joins reuse cached player rows instead of looking them up
+        self.profiles = PlayerProfileCache()
+        self.seated: Dict[int, Set[int]] = {}  # game_id -> telegram ids of its players
         logger.info("GameManager initialized")
 
+    def game_chat_for(self, update: Update) -> int:
+        """Resolves the game chat an update belongs to. Buttons and messages
+        from private chats map to the game the user is playing in."""
+        chat_id = update.effective_chat.id
+        if chat_id in self.active_games:
+            return chat_id
+        return self.player_chats.get(update.effective_user.id, chat_id)
+
+    def phase_key(self, update: Update) -> tuple:
+        """Identifies the game phase an update belongs to, from memory only"""
+        chat_id = self.game_chat_for(update)
+        game = self.active_games.get(chat_id)
+        if not game:
+            return (chat_id, None, None, None)
+        return (chat_id, game.id, game.current_phase, game.night_count)
+
+    @per_chat
     def create_game(self, chat_id: int) -> Game:
         try:
             db = next(get_db())
-            logger.info(f"Creating new game for chat_id: {chat_id}")
+            logger.info("Creating new game for chat_id: %s", chat_id)
+
+            # A running game or lobby in this chat is replaced: release its timers and state
+            if chat_id in self.active_games:
+                self.end_game(chat_id)
 
             # Check if game already exists
-            existing_game = db.query(Game).filter(Game.chat_id == chat_id).first()
+            existing_game = db.query(Game).filter(
+                Game.bot_id == self.bot_id,
+                Game.chat_id == chat_id
+            ).first()
             if existing_game:
-                logger.info(f"Found existing game for chat_id {chat_id}, cleaning up...")
+                logger.info("Found existing game for chat_id %s, cleaning up...", chat_id)
                 db.delete(existing_game)
                 db.commit()
+                self.seated.pop(existing_game.id, None)
 
             game = Game(
+                bot_id=self.bot_id,
                 chat_id=chat_id,
                 status=GameStatus.WAITING,
                 current_phase=None,
@@ -52,56 +164,105 @@ class GameManager:
             db.refresh(game)
 
             self.active_games[chat_id] = game
-            logger.info(f"Game created successfully with ID: {game.id}")
+            self.lobbies[chat_id] = {}
+            self.seated[game.id] = set()
+            self.unsaved_joins.pop(chat_id, None)
+            self.last_activity[chat_id] = time.monotonic()
+            logger.info("Game created successfully with ID: %s", game.id)
             return game
 
         except Exception as e:
-            logger.error(f"Error creating game: {e}", exc_info=True)
+            logger.error("Error creating game: %s", e, exc_info=True)
             raise
 
-    def add_player(self, game_id: int, telegram_id: int, username: str) -> Player:
+    def add_player(self, game_id: int, telegram_id: int, username: str) -> PlayerProfile:
+        return self.add_players(game_id, {telegram_id: username})[0]
+
+    def add_players(self, game_id: int, joins: Dict[int, str]) -> List[PlayerProfile]:
+        """Persists a batch of lobby joins (telegram_id -> username) in one commit.
+
+        Returning players found in the profile cache are moved with one bulk
+        UPDATE without being read; only cache misses are looked up, and new
+        players are inserted in one batch."""
         try:
             db = next(get_db())
-            logger.info(f"Adding player {username} (ID: {telegram_id}) to game {game_id}")
+            logger.info("Adding %s player(s) to game %s", len(joins), game_id)
+
+            profiles = self.profiles.get_many(joins)
+            misses = [tid for tid in joins if tid not in profiles]
+            if misses:
+                for row in db.query(Player.id, Player.telegram_id, Player.username, Player.game_id).filter(
+                    Player.bot_id == self.bot_id,
+                    Player.telegram_id.in_(misses)
+                ):
+                    profiles[row.telegram_id] = PlayerProfile(row.id, row.telegram_id, row.username, row.game_id)
 
             # Check current number of players
-            current_players = db.query(Player).filter(Player.game_id == game_id).count()
-            if current_players >= MAX_PLAYERS:
-                logger.warning(f"Maximum player limit reached for game {game_id}")
+            seated = self.seated.get(game_id)
+            if seated is None:
+                seated = self.seated[game_id] = {
+                    tid for (tid,) in db.query(Player.telegram_id).filter(Player.game_id == game_id)
+                }
+            new_count = sum(1 for tid in joins if tid not in seated)
+            if len(seated) + new_count > MAX_PLAYERS:
+                logger.warning("Maximum player limit reached for game %s", game_id)
                 raise ValueError(MESSAGES['too_many_players'])
 
-            player = db.query(Player).filter(Player.telegram_id == telegram_id).first()
-            if player:
-                if player.game_id != game_id:
-                    player.game_id = game_id
-                    player.username = username
-                    player.is_alive = True
-                    player.current_role = None
-                    player.is_revealed = False
-                    logger.info(f"Updated existing player: {username}")
-            else:
-                player = Player(
-                    telegram_id=telegram_id,
+            moved = [
+                {
+                    'id': profiles[tid].player_id,
+                    'game_id': game_id,
+                    'username': username,
+                    'is_alive': True,
+                    'current_role': None,
+                    'is_revealed': False,
+                }
+                for tid, username in joins.items()
+                if tid in profiles and profiles[tid].game_id != game_id
+            ]
+            created = [
+                Player(
+                    bot_id=self.bot_id,
+                    telegram_id=tid,
                     username=username,
                     game_id=game_id,
                     is_alive=True,
                     is_revealed=False
                 )
-                db.add(player)
-                logger.info(f"Created new player: {username}")
-
+                for tid, username in joins.items() if tid not in profiles
+            ]
+            if moved:
+                db.execute(update(Player), moved)
+            db.add_all(created)
             db.commit()
-            db.refresh(player)
-            return player
+            logger.debug("Game %s: %s player(s) moved, %s created", game_id, len(moved), len(created))
 
         except Exception as e:
-            logger.error(f"Error adding player: {e}", exc_info=True)
+            # The batch may have been partly applied; the next join reads the rows again
+            self.profiles.invalidate(joins)
+            logger.error("Error adding player: %s", e, exc_info=True)
             raise
 
+        # Write-through: the cache only learns what was committed
+        ids = {player.telegram_id: player.id for player in created}
+        result = []
+        for tid, username in joins.items():
+            previous = profiles.get(tid)
+            if previous is None:
+                result.append(PlayerProfile(ids[tid], tid, username, game_id))
+                continue
+            if previous.game_id != game_id:
+                self.seated.get(previous.game_id, set()).discard(tid)
+                previous = PlayerProfile(previous.player_id, tid, username, game_id)
+            result.append(previous)
+        seated.update(joins)
+        self.profiles.put_many(result)
+        return result
+
     def assign_roles(self, game_id: int) -> Dict[int, Role]:
         try:
             db = next(get_db())
-            logger.info(f"Assigning roles for game {game_id}")
+            logger.info("Assigning roles for game %s", game_id)
             game = db.query(Game).filter(Game.id == game_id).first()
             players = db.query(Player).filter(Player.game_id == game_id).all()
 
@@ -158,16 +319,22 @@ class GameManager:
                         game.mafia_chat_players.append(player)
 
             db.commit()
-            logger.info(f"Roles assigned successfully for game {game_id}")
+            logger.info("Roles assigned successfully for game %s", game_id)
             return roles_dict
         except Exception as e:
-            logger.error(f"Error assigning roles: {e}", exc_info=True)
+            logger.error("Error assigning roles: %s", e, exc_info=True)
             raise
 
+    def load_players(self, game_id: int) -> List[Player]:
+        """Fresh player rows for a game. Deaths are committed from other
+        sessions, so the game's own players relationship may be stale."""
+        db = next(get_db())
+        return db.query(Player).filter(Player.game_id == game_id).all()
+
     def process_night_actions(self, game_id: int) -> List[str]:
         try:
             db = next(get_db())
-            logger.info(f"Processing night actions for game {game_id}")
+            logger.info("Processing night actions for game %s", game_id)
             game = db.query(Game).filter(Game.id == game_id).first()
             actions = db.query(Action).filter(
                 Action.game_id == game_id,
@@ -190,19 +357,20 @@ class GameManager:
                     if target and target.id not in protected_players:
                         killed_players.add(target.id)
                         target.is_alive = False
+                        self.drop_mafia_member(target.telegram_id)
                         messages.append(MESSAGES['player_killed'].format(target.username))
 
             db.commit()
-            logger.info(f"Night actions processed for game {game_id}")
+            logger.info("Night actions processed for game %s", game_id)
             return messages
         except Exception as e:
-            logger.error(f"Error processing night actions: {e}", exc_info=True)
+            logger.error("Error processing night actions: %s", e, exc_info=True)
             return ["Ошибка при обработке ночных действий"]
 
     def check_game_end(self, game_id: int) -> tuple[bool, str]:
         try:
             db = next(get_db())
-            logger.info(f"Checking game end for game {game_id}")
+            logger.info("Checking game end for game %s", game_id)
             players = db.query(Player).filter(
                 Player.game_id == game_id,
                 Player.is_alive == True
@@ -218,126 +386,233 @@ class GameManager:
 
             return False, ""
         except Exception as e:
-            logger.error(f"Error checking game end: {e}", exc_info=True)
+            logger.error("Error checking game end: %s", e, exc_info=True)
             return False, "Ошибка при проверке окончания игры"
 
-    # Add more detailed logging to night_action_handler
-    def handle_night_action(self, update: Update, context: CallbackContext) -> None:
+    @per_update
+    def handle_night_action(self, update: Update, context: CallbackContext) -> bool:
         try:
             query = update.callback_query
-            logger.info(f"Handling night action from user {query.from_user.id}")
-
-            _, action_type, target_telegram_id = query.data.split('_')
-            logger.info(f"Action type: {action_type}, target: {target_telegram_id}")
+            # callback_data is night_action_<action type>_<target telegram id>
+            action_type, target_telegram_id = query.data[len("night_action_"):].split('_')
 
-            chat_id = query.message.chat_id
+            chat_id = self.game_chat_for(update)
             player_telegram_id = query.from_user.id
-
-            game = self.active_games.get(chat_id)
-            if not game or game.current_phase != GamePhase.NIGHT:
-                logger.warning(f"Invalid game state for night action: game={game}, phase={game.current_phase if game else None}")
-                query.answer(MESSAGES['not_night_phase'])
-                return
-
-            db = next(get_db())
-            player = db.query(Player).filter(
-                Player.game_id == game.id,
-                Player.telegram_id == player_telegram_id,
-                Player.is_alive == True
-            ).first()
-
-            if not player:
-                logger.warning(f"Player not found: telegram_id={player_telegram_id}")
-                query.answer(MESSAGES['player_not_found'])
-                return
-
-            target = db.query(Player).filter(
-                Player.game_id == game.id,
-                Player.telegram_id == int(target_telegram_id),
-                Player.is_alive == True
-            ).first()
-
-            if not target:
-                logger.warning(f"Target player not found: telegram_id={target_telegram_id}")
-                query.answer(MESSAGES['player_not_found'])
-                return
-
-            role_handler = self.role_handlers.get(player.current_role)
-            if not role_handler or not role_handler.night_action:
-                logger.warning(f"Invalid role handler: role={player.current_role}")
-                query.answer(MESSAGES['no_night_action'])
-                return
-
-            action_result = role_handler.night_action_handler(player, target, game.id)
-            if not action_result:
-                logger.warning(f"Night action failed: player={player.id}, target={target.id}")
-                query.answer(MESSAGES['action_failed'])
-                return
-
-            action = Action(
-                game_id=game.id,
-                player_id=player.id,
-                target_id=target.id,
-                action_type=ActionType(action_type),
-                night_number=game.night_count,
-                result=action_result
+            logger.info(
+                "Night action %s from user %s on %s", action_type, player_telegram_id, target_telegram_id,
+                extra=log_context(chat_id, self.active_games.get(chat_id), sample=NIGHT_CLICK_LOG_SAMPLE_RATE)
             )
+            self.autopilot.get(chat_id, set()).discard(player_telegram_id)
 
-            db.add(action)
-            db.commit()
-            logger.info(f"Night action successful: action_id={action.id}")
-            query.answer(MESSAGES['action_successful'])
+            result = self.submit_night_action(
+                chat_id, player_telegram_id, ActionType(action_type), int(target_telegram_id)
+            )
+            query.answer(MESSAGES[result])
+            self.close_phase_if_done(chat_id, context)
+            return result == 'action_successful'
 
         except ValueError as e:
-            logger.error(f"Value error in handle_night_action: {e}", exc_info=True)
+            logger.error("Value error in handle_night_action: %s", e, exc_info=True)
             if 'query' in locals():
                 query.answer(MESSAGES['action_failed'])
         except Exception as e:
-            logger.error(f"Error in handle_night_action: {e}", exc_info=True)
+            logger.error("Error in handle_night_action: %s", e, exc_info=True)
             if 'query' in locals():
                 query.answer(MESSAGES['action_failed'])
 
-    def handle_vote(self, update: Update, context: CallbackContext) -> None:
+    def submit_night_action(self, chat_id: int, player_telegram_id: int,
+                            action_type: ActionType, target_telegram_id: int) -> str:
+        """Records a night action for a player. Shared by the button callback
+        and by bot seats. Returns the MESSAGES key to answer with."""
+        game = self.active_games.get(chat_id)
+        if not game or game.current_phase != GamePhase.NIGHT:
+            logger.warning("Invalid game state for night action: game=%s, phase=%s", game, game.current_phase if game else None)
+            return 'not_night_phase'
+
+        db = next(get_db())
+        player = db.query(Player).filter(
+            Player.game_id == game.id,
+            Player.telegram_id == player_telegram_id,
+            Player.is_alive == True
+        ).first()
+
+        if not player:
+            logger.warning("Player not found: telegram_id=%s", player_telegram_id)
+            return 'player_not_found'
+
+        target = db.query(Player).filter(
+            Player.game_id == game.id,
+            Player.telegram_id == target_telegram_id,
+            Player.is_alive == True
+        ).first()
+
+        if not target:
+            logger.warning("Target player not found: telegram_id=%s", target_telegram_id)
+            return 'player_not_found'
+
+        role_handler = self.role_handlers.get(player.current_role)
+        if not role_handler or not role_handler.night_action:
+            logger.warning("Invalid role handler: role=%s", player.current_role)
+            return 'no_night_action'
+
+        action_result = role_handler.night_action_handler(player, target, game.id)
+        # A check's result is its finding (e.g. "not the commissioner"), not a
+        # rejection; other roles return False for an invalid choice
+        if not action_result and action_type != ActionType.CHECK:
+            logger.warning("Night action failed: player=%s, target=%s", player.id, target.id)
+            return 'action_failed'
+
+        # Last click wins: a new choice replaces the player's earlier action this night
+        db.query(Action).filter(
+            Action.game_id == game.id,
+            Action.player_id == player.id,
+            Action.night_number == game.night_count
+        ).delete(synchronize_session=False)
+
+        action = Action(
+            game_id=game.id,
+            player_id=player.id,
+            target_id=target.id,
+            action_type=action_type,
+            night_number=game.night_count,
+            result=action_result
+        )
+
+        db.add(action)
+        db.commit()
+        self.phase_acted.setdefault(chat_id, set()).add(player_telegram_id)
+        logger.info(
+            "Night action successful: action_id=%s", action.id,
+            extra=log_context(chat_id, game, sample=NIGHT_CLICK_LOG_SAMPLE_RATE)
+        )
+        return 'action_successful'
+
+    @per_update
+    def handle_vote(self, update: Update, context: CallbackContext) -> bool:
         try:
             query = update.callback_query
             _, target_telegram_id = query.data.split('_')
 
-            chat_id = query.message.chat_id
+            chat_id = self.game_chat_for(update)
             voter_telegram_id = query.from_user.id
+            self.autopilot.get(chat_id, set()).discard(voter_telegram_id)
 
-            game = self.active_games.get(chat_id)
-            if not game or game.current_phase != GamePhase.VOTING:
-                query.answer(MESSAGES['not_voting_phase'])
-                return
-
-            db = next(get_db())
-            voter = db.query(Player).filter(
-                Player.game_id == game.id,
-                Player.telegram_id == voter_telegram_id,
-                Player.is_alive == True
-            ).first()
-
-            if not voter:
-                query.answer(MESSAGES['player_not_found'])
-                return
-
-            if game.id not in self.player_votes:
-                self.player_votes[game.id] = {}
-
-            self.player_votes[game.id][voter.id] = int(target_telegram_id)
-            query.answer(MESSAGES['action_successful'])
-            logger.info(f"Vote registered from player {voter_telegram_id}")
+            result = self.submit_vote(chat_id, voter_telegram_id, int(target_telegram_id))
+            query.answer(MESSAGES[result])
+            self.close_phase_if_done(chat_id, context)
+            return result == 'action_successful'
         except Exception as e:
-            logger.error(f"Error handling vote: {e}", exc_info=True)
+            logger.error("Error handling vote: %s", e, exc_info=True)
             query.answer(MESSAGES['action_failed'])
 
+    def submit_vote(self, chat_id: int, voter_telegram_id: int, target_telegram_id: int) -> str:
+        """Registers a vote. Shared by the button callback and by bot seats.
+        Returns the MESSAGES key to answer with."""
+        game = self.active_games.get(chat_id)
+        if not game or game.current_phase != GamePhase.VOTING:
+            return 'not_voting_phase'
+
+        db = next(get_db())
+        voter = db.query(Player).filter(
+            Player.game_id == game.id,
+            Player.telegram_id == voter_telegram_id,
+            Player.is_alive == True
+        ).first()
+
+        if not voter:
+            return 'player_not_found'
+
+        if game.id not in self.player_votes:
+            self.player_votes[game.id] = {}
+
+        self.player_votes[game.id][voter.id] = target_telegram_id
+        self.phase_acted.setdefault(chat_id, set()).add(voter_telegram_id)
+        logger.info(
+            "Vote registered from player %s", voter_telegram_id,
+            extra=log_context(chat_id, game, sample=VOTE_LOG_SAMPLE_RATE)
+        )
+        return 'action_successful'
+
+    def begin_turn(self, chat_id: int, phase: GamePhase, players: List[Player], context: CallbackContext) -> None:
+        """Tracks who has to act in the phase and lets bot seats and players
+        on autopilot act right away, closing the phase early once everyone has."""
+        alive = [p for p in players if p.is_alive]
+        if phase == GamePhase.NIGHT:
+            actors = [
+                p for p in alive
+                if self.role_handlers.get(p.current_role) and self.role_handlers[p.current_role].night_action
+            ]
+        else:
+            actors = alive
+        self.phase_expected[chat_id] = {p.telegram_id for p in actors}
+        acted = self.phase_acted[chat_id] = set()
+
+        autopilot = self.autopilot.get(chat_id, set())
+        for player in actors:
+            if not is_bot_player(player.telegram_id) and player.telegram_id not in autopilot:
+                continue
+            if phase == GamePhase.NIGHT:
+                target = self.policy.night_target(player, players)
+                if target:
+                    self.submit_night_action(
+                        chat_id, player.telegram_id,
+                        self.role_handlers[player.current_role].night_action, target.telegram_id
+                    )
+            else:
+                target = self.policy.vote_target(player, players)
+                if target:
+                    self.submit_vote(chat_id, player.telegram_id, target.telegram_id)
+            # A policy seat never holds up the phase, even if its action was rejected
+            acted.add(player.telegram_id)
+
+        self.close_phase_if_done(chat_id, context)
+
+    def close_phase_if_done(self, chat_id: int, context: CallbackContext) -> None:
+        game = self.active_games.get(chat_id)
+        expected = self.phase_expected.get(chat_id)
+        if not game or expected is None or not expected <= self.phase_acted.get(chat_id, set()):
+            return
+
+        next_phase = {
+            GamePhase.NIGHT: self.start_day_phase,
+            GamePhase.VOTING: self.process_voting_phase,
+        }.get(game.current_phase)
+        if not next_phase:
+            return
+
+        logger.info("Everyone has acted, closing %s early in chat_id: %s", game.current_phase.value, chat_id)
+        self.cancel_phase_job(chat_id)
+        next_phase(chat_id, context)
+
+    def cancel_phase_job(self, chat_id: int) -> None:
+        cancel_job(self.phase_jobs.pop(chat_id, None))
+
+    def cancel_autofill(self, chat_id: int) -> None:
+        cancel_job(self.autofill_jobs.pop(chat_id, None))
+
+    def track_idle_players(self, chat_id: int) -> None:
+        """Puts players who keep skipping votes on autopilot"""
+        acted = self.phase_acted.get(chat_id, set())
+        strikes = self.idle_strikes.setdefault(chat_id, {})
+        for telegram_id in self.phase_expected.get(chat_id, set()):
+            if is_bot_player(telegram_id):
+                continue
+            if telegram_id in acted:
+                strikes.pop(telegram_id, None)
+                continue
+            strikes[telegram_id] = strikes.get(telegram_id, 0) + 1
+            if strikes[telegram_id] >= IDLE_PHASES_FOR_AUTOPILOT:
+                logger.info("Player %s is idle, bot takes over in chat_id: %s", telegram_id, chat_id)
+                self.autopilot.setdefault(chat_id, set()).add(telegram_id)
+
     def process_votes(self, game_id: int) -> List[str]:
         try:
-            if game_id not in self.player_votes:
+            # Votes belong to a single voting phase, so drop them once counted
+            votes = self.player_votes.pop(game_id, None)
+            if not votes:
                 return ["Нет голосов"]
 
             db = next(get_db())
-            votes = self.player_votes[game_id]
 
             vote_counts = {}
             for target_telegram_id in votes.values():
@@ -362,52 +637,319 @@ class GameManager:
             if voted_player:
                 voted_player.is_alive = False
                 db.commit()
-                logger.info(f"Player {voted_player.username} eliminated by vote in game {game_id}")
+                self.drop_mafia_member(voted_player.telegram_id)
+                logger.info("Player %s eliminated by vote in game %s", voted_player.username, game_id)
                 return [MESSAGES['player_killed'].format(voted_player.username)]
 
             return ["Ошибка при подсчете голосов"]
         except Exception as e:
-            logger.error(f"Error processing votes: {e}", exc_info=True)
+            logger.error("Error processing votes: %s", e, exc_info=True)
             return ["Ошибка при обработке голосов"]
 
+    def schedule_phase(self, chat_id: int, context: CallbackContext, callback, delay: float) -> None:
+        """Persists the current phase with its deadline and schedules the next transition"""
+        game = self.active_games[chat_id]
+        self.last_activity[chat_id] = time.monotonic()
+        try:
+            self._persist_game(game, {
+                'status': game.status,
+                'current_phase': game.current_phase,
+                'night_count': game.night_count,
+                'phase_deadline': datetime.utcnow() + timedelta(seconds=delay),
+            })
+        except Exception as e:
+            logger.error("Failed to persist phase for game %s: %s", game.id, e)
+
+        self.cancel_phase_job(chat_id)
+        scheduled_for = (game.current_phase, game.night_count)
+        self.phase_jobs[chat_id] = context.job_queue.run_once(
+            lambda x: callback(chat_id, context, scheduled_for),
+            delay,
+            context=chat_id
+        )
+
+    def is_stale(self, chat_id: int, scheduled_for: Optional[tuple]) -> bool:
+        """A timed transition is stale once the game has left the phase it was
+        scheduled in, e.g. because everyone acted and the phase closed early"""
+        if scheduled_for is None:
+            return False
+        game = self.active_games.get(chat_id)
+        return not game or (game.current_phase, game.night_count) != scheduled_for
+
+    def _persist_game(self, game: Game, values: dict) -> None:
+        """Writes game state through the session that owns the object, so
+        pending in-memory changes are flushed with it instead of racing it."""
+        for key, value in values.items():
+            setattr(game, key, value)
+        db = object_session(game)
+        if db is not None:
+            db.commit()
+            return
+        db = next(get_db())
+        db.query(Game).filter(Game.id == game.id).update(values)
+        db.commit()
+
+    @per_chat
+    def end_game(self, chat_id: int) -> None:
+        """Marks the game finished and releases all in-memory state kept for the chat"""
+        game = self.active_games.pop(chat_id, None)
+        if not game:
+            return
+        self.player_votes.pop(game.id, None)
+        self.seated.pop(game.id, None)
+        self.lobbies.pop(chat_id, None)
+        self.unsaved_joins.pop(chat_id, None)
+        self.lobby_messages.pop(chat_id, None)
+        self.lobby_flush_pending.discard(chat_id)
+        self.outbox.discard(chat_id)
+        self.last_activity.pop(chat_id, None)
+        for telegram_id in [tid for tid, cid in list(self.player_chats.items()) if cid == chat_id]:
+            self.player_chats.pop(telegram_id, None)
+        self.mafia_members.pop(chat_id, None)
+        self.virtual_chats.pop(chat_id, None)
+        self.cancel_phase_job(chat_id)
+        self.cancel_autofill(chat_id)
+        for state in (self.phase_expected, self.phase_acted, self.idle_strikes, self.autopilot):
+            state.pop(chat_id, None)
+        try:
+            self._persist_game(game, {'status': GameStatus.FINISHED, 'phase_deadline': None})
+        except Exception as e:
+            logger.error("Failed to mark game %s finished: %s", game.id, e)
+
+    def sweep(self, context: CallbackContext) -> None:
+        """Periodic job: evicts idle lobbies and stalled games, drops orphaned
+        votes and logs memory gauges."""
+        try:
+            now = time.monotonic()
+            utcnow = datetime.utcnow()
+            evicted = 0
+            for chat_id, game in list(self.active_games.items()):
+                if game.status == GameStatus.WAITING:
+                    idle = now - self.last_activity.get(chat_id, now)
+                    if idle > LOBBY_TTL:
+                        logger.info("Evicting lobby in chat %s after %.0fs idle", chat_id, idle)
+                        self.end_game(chat_id)
+                        evicted += 1
+                elif game.phase_deadline and utcnow - game.phase_deadline > timedelta(seconds=STALLED_GAME_GRACE):
+                    logger.warning("Evicting stalled game %s in chat %s", game.id, chat_id)
+                    self.end_game(chat_id)
+                    evicted += 1
+                elif not game.phase_deadline and now - self.last_activity.get(chat_id, now) > STALLED_GAME_GRACE:
+                    # Active but no phase was ever scheduled, e.g. night 1 failed to start
+                    logger.warning("Evicting game %s in chat %s with no phase timer", game.id, chat_id)
+                    self.end_game(chat_id)
+                    evicted += 1
+
+            live_game_ids = {game.id for game in self.active_games.values()}
+            for game_id in [gid for gid in list(self.player_votes) if gid not in live_game_ids]:
+                self.player_votes.pop(game_id, None)
+
+            # Gauges walk every game, so only compute them when they will be logged
+            if logger.isEnabledFor(logging.INFO):
+                usage = self.memory_usage()
+                logger.info(
+                    "Sweep done: evicted=%s games=%s players=%s bytes=%s profiles=%s",
+                    evicted, len(self.active_games),
+                    sum(u['players'] for u in usage.values()),
+                    sum(u['bytes'] for u in usage.values()),
+                    len(self.profiles)
+                )
+        except Exception as e:
+            logger.error("Error sweeping games: %s", e, exc_info=True)
+
+    def memory_usage(self) -> Dict[int, Dict[str, int]]:
+        """Approximate in-memory footprint per game chat"""
+        usage = {}
+        for chat_id, game in list(self.active_games.items()):
+            votes = self.player_votes.get(game.id, {})
+            lobby = self.lobbies.get(chat_id, {})
+            mafia = self.mafia_members.get(chat_id, set())
+            # Only count players that are already loaded, never trigger a lazy load
+            players = game.__dict__.get('players') or []
+            usage[chat_id] = {
+                'players': len(players) or len(lobby),
+                'votes': len(votes),
+                'pending_messages': len(self.outbox.pending.get(chat_id, [])),
+                'bytes': (
+                    sys.getsizeof(game) + sum(sys.getsizeof(p) for p in players)
+                    + sys.getsizeof(votes) + sys.getsizeof(lobby) + sys.getsizeof(mafia)
+                ),
+            }
+        return usage
+
+    def recover_games(self, dispatcher: Dispatcher) -> int:
+        """Reloads unfinished games after a restart and resumes their phase timers.
+
+        Games are loaded in bulk batches of RECOVERY_BATCH_SIZE; once
+        RECOVERY_TIME_BUDGET is spent the remaining batches are deferred to
+        the job queue so startup time stays bounded."""
+        context = CallbackContext(dispatcher)
+        return self._recover_batches(context, last_id=0, recovered=0, started=time.monotonic())
+
+    def _recover_batches(self, context: CallbackContext, last_id: int, recovered: int, started: float) -> int:
+        budget_start = time.monotonic()
+        db = next(get_db())
+        while True:
+            games = db.query(Game).options(selectinload(Game.players)).filter(
+                Game.bot_id == self.bot_id,
+                Game.status.in_([GameStatus.WAITING, GameStatus.ACTIVE]),
+                Game.id > last_id
+            ).order_by(Game.id).limit(RECOVERY_BATCH_SIZE).all()
+
+            if not games:
+                logger.info("Recovered %s game(s) in %.2fs", recovered, time.monotonic() - started)
+                return recovered
+
+            now = datetime.utcnow()
+            for game in games:
+                try:
+                    self._resume_game(game, context, now, overdue_slot=recovered)
+                    recovered += 1
+                except Exception as e:
+                    logger.error("Failed to recover game %s: %s", game.id, e, exc_info=True)
+            last_id = games[-1].id
+
+            if time.monotonic() - budget_start > RECOVERY_TIME_BUDGET:
+                logger.warning("Recovery budget spent after %s game(s), deferring the rest", recovered)
+                context.job_queue.run_once(
+                    lambda x: self._recover_batches(context, last_id, recovered, started),
+                    0
+                )
+                return recovered
+
+    def _resume_game(self, game: Game, context: CallbackContext, now: datetime, overdue_slot: int) -> None:
+        chat_id = game.chat_id
+        self.active_games[chat_id] = game
+        self.last_activity[chat_id] = time.monotonic()
+        self.seated[game.id] = {p.telegram_id for p in game.players}
+        self.profiles.put_many(
+            PlayerProfile(p.id, p.telegram_id, p.username, p.game_id) for p in game.players
+        )
+        if is_virtual_chat(chat_id):
+            self.virtual_chats[chat_id] = [p.telegram_id for p in game.players]
+
+        if game.status == GameStatus.WAITING:
+            self.lobbies[chat_id] = {p.telegram_id: p.username for p in game.players}
+            return
+
+        self.register_players(chat_id, {
+            p.telegram_id: p.current_role for p in game.players if p.is_alive
+        })
+
+        next_phase = {
+            GamePhase.NIGHT: self.start_day_phase,
+            GamePhase.DAY: self.start_voting_phase,
+            GamePhase.VOTING: self.process_voting_phase,
+        }.get(game.current_phase, self.start_night_phase)
+
+        if game.phase_deadline:
+            delay = (game.phase_deadline - now).total_seconds()
+        else:
+            delay = 0
+        if delay <= 0:
+            # Spread overdue transitions out instead of firing them all at once
+            delay = overdue_slot * RECOVERY_STAGGER
+
+        self.cancel_phase_job(chat_id)
+        scheduled_for = (game.current_phase, game.night_count)
+        self.phase_jobs[chat_id] = context.job_queue.run_once(
+            lambda x: next_phase(chat_id, context, scheduled_for),
+            delay,
+            context=chat_id
+        )
+
+    def register_players(self, chat_id: int, roles: Dict[int, Role]) -> None:
+        """Indexes living players of a game and builds its mafia fan-out set"""
+        for telegram_id in roles:
+            self.player_chats[telegram_id] = chat_id
+        self.mafia_members[chat_id] = {
+            telegram_id for telegram_id, role in roles.items()
+            if role in [Role.MAFIA, Role.DON]
+        }
+
+    def drop_mafia_member(self, telegram_id: int) -> None:
+        chat_id = self.player_chats.get(telegram_id)
+        if chat_id in self.mafia_members:
+            self.mafia_members[chat_id].discard(telegram_id)
+
+    def relay_mafia_message(self, update: Update, context: CallbackContext) -> None:
+        """Forwards a private message from a living mafia member to their living teammates.
+
+        Runs without the game lock: it only reads in-memory state, and phase
+        transitions hold the lock while they send their messages."""
+        try:
+            message = update.effective_message
+            sender_id = update.effective_user.id
+
+            chat_id = self.player_chats.get(sender_id)
+            members = self.mafia_members.get(chat_id)
+            if not members or sender_id not in members:
+                return
+
+            game = self.active_games.get(chat_id)
+            if not game or game.current_phase != GamePhase.NIGHT:
+                message.reply_text(MESSAGES['mafia_chat_night_only'])
+                return
+
+            username = update.effective_user.username or update.effective_user.first_name
+            # Copy first, the set may shrink under a concurrent night resolution
+            recipients = [tid for tid in list(members) if tid != sender_id and not is_bot_player(tid)]
+            self.sender.fan_out(
+                context.bot,
+                recipients,
+                MESSAGES['mafia_chat_message'].format(username, message.text)
+            )
+        except Exception as e:
+            logger.error("Error relaying mafia message: %s", e, exc_info=True)
+
+    @per_chat
     def start_game(self, chat_id: int, context: CallbackContext) -> None:
         try:
-            logger.info(f"Starting game in chat_id: {chat_id}")
+            logger.info("Starting game in chat_id: %s", chat_id)
             game = self.active_games[chat_id]
             game.status = GameStatus.ACTIVE
+            self.cancel_autofill(chat_id)
 
             roles = self.assign_roles(game.id)
+            self.register_players(chat_id, roles)
 
             for telegram_id, role in roles.items():
-                try:
-                    role_message = MESSAGES[f'role_{role.value}']
-                    context.bot.send_message(telegram_id, role_message)
-                except Exception as e:
-                    logger.error(f"Failed to send role to {telegram_id}: {e}")
+                if is_bot_player(telegram_id):
+                    continue
+                self.sender.send(context.bot, telegram_id, MESSAGES[f'role_{role.value}'])
 
-            context.bot.send_message(chat_id, MESSAGES['game_start'])
+            self.outbox.queue(chat_id, MESSAGES['game_start'])
             self.start_night_phase(chat_id, context)
-            logger.info(f"Game started successfully in chat_id: {chat_id}")
+            logger.info("Game started successfully in chat_id: %s", chat_id, extra=log_context(chat_id, self.active_games.get(chat_id)))
         except Exception as e:
-            logger.error(f"Error starting game: {e}", exc_info=True)
-            context.bot.send_message(chat_id, MESSAGES['game_start_failed'])
-
-    def start_night_phase(self, chat_id: int, context: CallbackContext):
+            logger.error("Error starting game: %s", e, exc_info=True)
+            self.outbox.discard(chat_id)
+            self.outbox.queue(chat_id, MESSAGES['game_start_failed'])
+            self.flush_chat(context.bot, chat_id)
+            # A half-started game has no phase timer and would never finish
+            self.end_game(chat_id)
+
+    @per_chat
+    def start_night_phase(self, chat_id: int, context: CallbackContext, scheduled_for: Optional[tuple] = None):
+        if self.is_stale(chat_id, scheduled_for):
+            return
         try:
-            logger.info(f"Starting night phase in chat_id: {chat_id}")
+            logger.info("Starting night phase in chat_id: %s", chat_id, extra=log_context(chat_id, self.active_games.get(chat_id)))
             game = self.active_games[chat_id]
             game.current_phase = GamePhase.NIGHT
             game.night_count += 1
 
-            context.bot.send_message(chat_id, MESSAGES['night_phase'])
+            self.outbox.queue(chat_id, MESSAGES['night_phase'])
+            self.flush_chat(context.bot, chat_id)
 
-            for player in game.players:
-                if not player.is_alive:
+            players = self.load_players(game.id)
+            for player in players:
+                if not player.is_alive or is_bot_player(player.telegram_id):
                     continue
 
                 role_handler = self.role_handlers.get(player.current_role)
                 if role_handler and role_handler.night_action:
-                    targets = [p for p in game.players if p.is_alive and p.telegram_id != player.telegram_id]
+                    targets = [p for p in players if p.is_alive and p.telegram_id != player.telegram_id]
                     markup = InlineKeyboardMarkup([
                         [InlineKeyboardButton(
                             target.username,
@@ -416,59 +958,61 @@ class GameManager:
                         for target in targets
                     ])
 
-                    try:
-                        context.bot.send_message(
-                            player.telegram_id,
-                            MESSAGES[f'{player.current_role.value}_action'],
-                            reply_markup=markup
-                        )
-                    except Exception as e:
-                        logger.error(f"Failed to send night action to {player.telegram_id}: {e}")
-
-            context.job_queue.run_once(
-                lambda x: self.start_day_phase(chat_id, context),
-                120,  # 2 minutes for night phase
-                context=chat_id
-            )
-            logger.info(f"Night phase started successfully in chat_id: {chat_id}")
+                    self.sender.send(
+                        context.bot,
+                        player.telegram_id,
+                        MESSAGES[f'{player.current_role.value}_action'],
+                        reply_markup=markup
+                    )
+
+            self.schedule_phase(chat_id, context, self.start_day_phase, NIGHT_DURATION)
+            self.begin_turn(chat_id, GamePhase.NIGHT, players, context)
+            logger.info("Night phase started successfully in chat_id: %s", chat_id, extra=log_context(chat_id, self.active_games.get(chat_id)))
         except Exception as e:
-            logger.error(f"Error starting night phase: {e}", exc_info=True)
+            logger.error("Error starting night phase: %s", e, exc_info=True)
+            self.flush_chat(context.bot, chat_id)
 
-    def start_day_phase(self, chat_id: int, context: CallbackContext):
+    @per_chat
+    def start_day_phase(self, chat_id: int, context: CallbackContext, scheduled_for: Optional[tuple] = None):
+        if self.is_stale(chat_id, scheduled_for):
+            return
         try:
-            logger.info(f"Starting day phase in chat_id: {chat_id}")
+            logger.info("Starting day phase in chat_id: %s", chat_id, extra=log_context(chat_id, self.active_games.get(chat_id)))
             game = self.active_games[chat_id]
             game.current_phase = GamePhase.DAY
 
             night_results = self.process_night_actions(game.id)
             for message in night_results:
-                context.bot.send_message(chat_id, message)
+                self.outbox.queue(chat_id, message)
 
             game_ended, end_message = self.check_game_end(game.id)
             if game_ended:
-                context.bot.send_message(chat_id, end_message)
-                del self.active_games[chat_id]
-                logger.info(f"Game ended in chat_id: {chat_id}")
+                self.outbox.queue(chat_id, end_message)
+                self.flush_chat(context.bot, chat_id)
+                self.end_game(chat_id)
+                logger.info("Game ended in chat_id: %s", chat_id, extra=log_context(chat_id, game))
                 return
 
-            context.bot.send_message(chat_id, MESSAGES['day_phase'])
+            self.outbox.queue(chat_id, MESSAGES['day_phase'])
+            self.flush_chat(context.bot, chat_id)
 
-            context.job_queue.run_once(
-                lambda x: self.start_voting_phase(chat_id, context),
-                180,  # 3 minutes for day phase
-                context=chat_id
-            )
-            logger.info(f"Day phase started successfully in chat_id: {chat_id}")
+            self.schedule_phase(chat_id, context, self.start_voting_phase, DAY_DURATION)
+            logger.info("Day phase started successfully in chat_id: %s", chat_id, extra=log_context(chat_id, self.active_games.get(chat_id)))
         except Exception as e:
-            logger.error(f"Error starting day phase: {e}", exc_info=True)
+            logger.error("Error starting day phase: %s", e, exc_info=True)
+            self.flush_chat(context.bot, chat_id)
 
-    def start_voting_phase(self, chat_id: int, context: CallbackContext):
+    @per_chat
+    def start_voting_phase(self, chat_id: int, context: CallbackContext, scheduled_for: Optional[tuple] = None):
+        if self.is_stale(chat_id, scheduled_for):
+            return
         try:
-            logger.info(f"Starting voting phase in chat_id: {chat_id}")
+            logger.info("Starting voting phase in chat_id: %s", chat_id, extra=log_context(chat_id, self.active_games.get(chat_id)))
             game = self.active_games[chat_id]
             game.current_phase = GamePhase.VOTING
 
-            alive_players = [p for p in game.players if p.is_alive]
+            players = self.load_players(game.id)
+            alive_players = [p for p in players if p.is_alive]
             markup = InlineKeyboardMarkup([
                 [InlineKeyboardButton(
                     player.username,
@@ -477,86 +1021,252 @@ class GameManager:
                 for player in alive_players
             ])
 
-            context.bot.send_message(
-                chat_id,
-                MESSAGES['voting_phase'],
-                reply_markup=markup
-            )
+            self.outbox.queue(chat_id, MESSAGES['voting_phase'])
+            self.flush_chat(context.bot, chat_id, reply_markup=markup)
 
-            context.job_queue.run_once(
-                lambda x: self.process_voting_phase(chat_id, context),
-                60,  # 1 minute for voting
-                context=chat_id
-            )
-            logger.info(f"Voting phase started successfully in chat_id: {chat_id}")
+            self.schedule_phase(chat_id, context, self.process_voting_phase, VOTING_DURATION)
+            self.begin_turn(chat_id, GamePhase.VOTING, players, context)
+            logger.info("Voting phase started successfully in chat_id: %s", chat_id, extra=log_context(chat_id, self.active_games.get(chat_id)))
         except Exception as e:
-            logger.error(f"Error starting voting phase: {e}", exc_info=True)
+            logger.error("Error starting voting phase: %s", e, exc_info=True)
 
-    def process_voting_phase(self, chat_id: int, context: CallbackContext):
+    @per_chat
+    def process_voting_phase(self, chat_id: int, context: CallbackContext, scheduled_for: Optional[tuple] = None):
+        if self.is_stale(chat_id, scheduled_for):
+            return
         try:
-            logger.info(f"Processing voting phase in chat_id: {chat_id}")
+            logger.info("Processing voting phase in chat_id: %s", chat_id, extra=log_context(chat_id, self.active_games.get(chat_id)))
             game = self.active_games[chat_id]
+            self.track_idle_players(chat_id)
             vote_results = self.process_votes(game.id)
 
             for message in vote_results:
-                context.bot.send_message(chat_id, message)
+                self.outbox.queue(chat_id, message)
 
             game_ended, end_message = self.check_game_end(game.id)
             if game_ended:
-                context.bot.send_message(chat_id, end_message)
-                del self.active_games[chat_id]
-                logger.info(f"Game ended in chat_id: {chat_id}")
+                self.outbox.queue(chat_id, end_message)
+                self.flush_chat(context.bot, chat_id)
+                self.end_game(chat_id)
+                logger.info("Game ended in chat_id: %s", chat_id, extra=log_context(chat_id, game))
                 return
 
             self.start_night_phase(chat_id, context)
-            logger.info(f"Voting phase processed successfully in chat_id: {chat_id}")
+            logger.info("Voting phase processed successfully in chat_id: %s", chat_id, extra=log_context(chat_id, self.active_games.get(chat_id)))
         except Exception as e:
-            logger.error(f"Error processing voting phase: {e}", exc_info=True)
+            logger.error("Error processing voting phase: %s", e, exc_info=True)
+            self.flush_chat(context.bot, chat_id)
+
+    def flush_chat(self, bot, chat_id: int, reply_markup: InlineKeyboardMarkup = None) -> None:
+        """Sends queued messages to the game chat, or to every member's
+        private chat when the game was formed by the matchmaker."""
+        members = self.virtual_chats.get(chat_id)
+        if members is None:
+            recipients = [chat_id]
+        else:
+            recipients = [tid for tid in members if not is_bot_player(tid)]
+        # Sent by the shared sender, which keeps the bot's send rate
+        self.sender.fan_out_chunks(bot, recipients, self.outbox.take(chat_id), reply_markup)
+
+    def queue_command(self, update: Update, context: CallbackContext) -> None:
+        """/queue [language] - waits for a matched game with players from any chat"""
+        try:
+            user = update.effective_user
+            language = context.args[0].lower() if context.args else DEFAULT_LANGUAGE
+
+            if user.id in self.player_chats or self.in_lobby(user.id):
+                update.effective_message.reply_text(MESSAGES['queue_already_in_game'])
+                return
+
+            queued = self.matchmaking.enqueue(QueuedPlayer(
+                telegram_id=user.id,
+                username=user.username or user.first_name,
+                language=language
+            ))
+            update.effective_message.reply_text(
+                MESSAGES['queue_joined' if queued else 'queue_already_queued'].format(len(self.matchmaking))
+            )
+            if queued:
+                self.run_matchmaker(context)
+        except Exception as e:
+            logger.error("Error in queue_command: %s", e, exc_info=True)
+
+    def in_lobby(self, telegram_id: int, exclude: Optional[int] = None) -> bool:
+        """Whether the player is on the roster of any chat other than `exclude`"""
+        return any(
+            telegram_id in roster
+            for chat_id, roster in list(self.lobbies.items()) if chat_id != exclude
+        )
+
+    def leave_queue_command(self, update: Update, context: CallbackContext) -> None:
+        if self.matchmaking.remove(update.effective_user.id):
+            update.effective_message.reply_text(MESSAGES['queue_left'])
+        else:
+            update.effective_message.reply_text(MESSAGES['queue_not_queued'])
+
+    def run_matchmaker(self, context: CallbackContext) -> None:
+        """Forms games from the matchmaking queue; also runs as a periodic job"""
+        try:
+            target_size = min(MATCH_TARGET_SIZE, MAX_PLAYERS)
+            for players in self.matchmaking.match(MIN_PLAYERS, target_size=target_size):
+                self.start_matched_game(self.next_virtual_chat_id(), players, context)
+        except Exception as e:
+            logger.error("Error running matchmaker: %s", e, exc_info=True)
+
+    def next_virtual_chat_id(self) -> int:
+        """Time-based so ids stay unique across restarts"""
+        with self.matchmaking.lock:
+            chat_id = min(VIRTUAL_CHAT_BASE - time.time_ns() // 1000, self.last_virtual_chat_id - 1)
+            self.last_virtual_chat_id = chat_id
+            return chat_id
+
+    @per_chat
+    def start_matched_game(self, chat_id: int, players: List[QueuedPlayer], context: CallbackContext) -> None:
+        try:
+            logger.info("Starting matched game %s with %s players", chat_id, len(players))
+            game = self.create_game(chat_id)
+            self.virtual_chats[chat_id] = [p.telegram_id for p in players]
+            self.lobbies[chat_id] = {p.telegram_id: p.username for p in players}
+            self.add_players(game.id, self.lobbies[chat_id])
+
+            self.outbox.queue(chat_id, MESSAGES['match_found'].format(
+                "\n".join(f"{i}. {p.username}" for i, p in enumerate(players, 1))
+            ))
+            self.start_game(chat_id, context)
+        except Exception as e:
+            logger.error("Error starting matched game: %s", e, exc_info=True)
+            # Put the players back at the head of the queue, keeping their wait time
+            self.matchmaking.requeue(players)
+            self.end_game(chat_id)
 
     def format_player_list(self, players: List[Player]) -> str:
         return "\n".join([f"{i + 1}. {player.username}" for i, player in enumerate(players)])
 
-    def join_callback(self, update: Update, context: CallbackContext) -> None:
+    def render_lobby(self, chat_id: int) -> str:
+        roster = self.lobbies.get(chat_id, {})
+        player_list = "\n".join(f"{i}. {name}" for i, name in enumerate(roster.values(), 1))
+        return MESSAGES['waiting_for_players'].format(len(roster), MIN_PLAYERS, player_list)
+
+    @per_chat
+    def flush_lobby(self, chat_id: int) -> None:
+        """Persists buffered joins in one batch and re-renders the lobby message"""
+        self.lobby_flush_pending.discard(chat_id)
+        game = self.active_games.get(chat_id)
+        joins = self.unsaved_joins.pop(chat_id, {})
+        if not game:
+            return
+
+        if joins:
+            try:
+                self.add_players(game.id, joins)
+            except Exception as e:
+                logger.error("Failed to persist lobby joins in chat %s: %s", chat_id, e)
+                roster = self.lobbies.get(chat_id, {})
+                for telegram_id in joins:
+                    roster.pop(telegram_id, None)
+                # Let the dropped players press "join" again
+                self.admission.forget(joins)
+
+        message = self.lobby_messages.get(chat_id)
+        if game.status != GameStatus.WAITING or not message:
+            return
+
+        keyboard = [[InlineKeyboardButton("Միանալ", callback_data="join")]]
+        try:
+            message.edit_text(
+                self.render_lobby(chat_id),
+                reply_markup=InlineKeyboardMarkup(keyboard),
+                parse_mode=ParseMode.HTML
+            )
+        except Exception as e:
+            logger.error("Failed to update lobby message in chat %s: %s", chat_id, e)
+
+    @per_chat
+    def autofill_lobby(self, chat_id: int, context: CallbackContext) -> None:
+        """Fills the free seats of a short lobby with bot players and starts the game"""
+        self.autofill_jobs.pop(chat_id, None)
+        try:
+            game = self.active_games.get(chat_id)
+            roster = self.lobbies.get(chat_id)
+            if not game or game.status != GameStatus.WAITING or not roster or len(roster) >= MIN_PLAYERS:
+                return
+
+            # Persist buffered human joins before the bots take their seats
+            self.flush_lobby(chat_id)
+            bots = {}
+            seat = 0
+            while len(roster) + len(bots) < MIN_PLAYERS:
+                seat += 1
+                telegram_id = bot_telegram_id(game.id, seat)
+                if telegram_id not in roster:
+                    bots[telegram_id] = BOT_NAME.format(seat)
+
+            self.add_players(game.id, bots)
+            roster.update(bots)
+            logger.info("Added %s bot player(s) to game %s", len(bots), game.id)
+            self.start_game(chat_id, context)
+        except Exception as e:
+            logger.error("Error filling lobby with bots: %s", e, exc_info=True)
+
+    @per_update
+    def join_callback(self, update: Update, context: CallbackContext) -> bool:
+        """Acknowledges a join from memory; the lobby message is re-rendered
+        and joins are persisted at most once per LOBBY_UPDATE_INTERVAL."""
         try:
             query = update.callback_query
             chat_id = query.message.chat_id
             user_id = query.from_user.id
             username = query.from_user.username or query.from_user.first_name
 
-            logger.info(f"User {username} ({user_id}) trying to join game in chat {chat_id}")
+            logger.debug("User %s (%s) trying to join game in chat %s", username, user_id, chat_id)
 
             game = self.active_games.get(chat_id)
             if not game or game.status != GameStatus.WAITING:
                 query.answer(MESSAGES['game_already_started'])
                 return
 
-            try:
-                player = self.add_player(game.id, user_id, username)
-                query.answer(MESSAGES['player_joined'].format(username))
-            except ValueError as e:
-                query.answer(str(e))
-                return
-
-            players = game.players
-            players_count = len(players)
-
-            if players_count >= MIN_PLAYERS:
-                self.start_game(chat_id, context)
-            else:
-                keyboard = [[InlineKeyboardButton("Միանալ", callback_data="join")]]
-                player_list = self.format_player_list(players)
-                query.message.edit_text(
-                    MESSAGES['waiting_for_players'].format(
-                        players_count,
-                        MIN_PLAYERS,
-                        player_list
-                    ),
-                    reply_markup=InlineKeyboardMarkup(keyboard),
-                    parse_mode=ParseMode.HTML
+            roster = self.lobbies.setdefault(chat_id, {})
+            if user_id not in roster:
+                if len(roster) >= MAX_PLAYERS:
+                    query.answer(MESSAGES['too_many_players'])
+                    return
+                # Joining would move the player's row out of the other game
+                # while its roster still counts them
+                if user_id in self.player_chats or self.in_lobby(user_id, exclude=chat_id):
+                    query.answer(MESSAGES['already_in_game'])
+                    return
+                # A player waits either in a lobby or in the matchmaking queue
+                self.matchmaking.remove(user_id)
+                roster[user_id] = username
+                self.unsaved_joins.setdefault(chat_id, {})[user_id] = username
+                if chat_id not in self.autofill_jobs:
+                    self.autofill_jobs[chat_id] = context.job_queue.run_once(
+                        lambda x: self.autofill_lobby(chat_id, context),
+                        AUTOFILL_DELAY,
+                        context=chat_id
+                    )
+
+            query.answer(MESSAGES['player_joined'].format(username))
+            self.lobby_messages[chat_id] = query.message
+            self.last_activity[chat_id] = time.monotonic()
+
+            if len(roster) >= MIN_PLAYERS:
+                self.flush_lobby(chat_id)
+                # The batch may have been rejected, so re-check the roster
+                if len(roster) >= MIN_PLAYERS:
+                    self.start_game(chat_id, context)
+            elif chat_id not in self.lobby_flush_pending:
+                self.lobby_flush_pending.add(chat_id)
+                context.job_queue.run_once(
+                    lambda x: self.flush_lobby(chat_id),
+                    LOBBY_UPDATE_INTERVAL,
+                    context=chat_id
                 )
 
-            logger.info(f"Player {username} successfully joined the game")
+            logger.info("Player %s joined the lobby", username, extra=log_context(chat_id, game))
+            # An immediate flush may have rejected the join
+            return user_id in roster
         except Exception as e:
-            logger.error(f"Error in join_callback: {e}", exc_info=True)
+            logger.error("Error in join_callback: %s", e, exc_info=True)
             if 'query' in locals():
-                query.answer(MESSAGES['error_joining'])
\ No newline at end of file
+                query.answer(MESSAGES['error_joining'])
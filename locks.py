@@ -0,0 +1,29 @@
+from typing import Callable, List
+import functools
+import threading
+
+# Number of lock stripes; chats hash onto a stripe, so unrelated games
+# rarely contend while every game is always guarded by the same lock
+LOCK_STRIPES = 64
+
+
+class StripedLock:
+    """A fixed pool of re-entrant locks indexed by chat id"""
+
+    def __init__(self, stripes: int = LOCK_STRIPES):
+        self.locks: List[threading.RLock] = [threading.RLock() for _ in range(stripes)]
+
+    def for_chat(self, chat_id: int) -> threading.RLock:
+        return self.locks[hash(chat_id) % len(self.locks)]
+
+
+def serialized_by(key: Callable) -> Callable:
+    """Decorates a GameManager method so it runs under the lock of the chat
+    returned by key(self, *args, **kwargs)."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.chat_locks.for_chat(key(self, *args, **kwargs)):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
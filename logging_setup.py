@@ -0,0 +1,89 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+
+# Context fields copied from `extra` into every JSON record
+CONTEXT_FIELDS = ('chat_id', 'game_id', 'phase')
+
+# Sampling rates for high-volume events, passed as extra={'sample': rate}
+VOTE_LOG_SAMPLE_RATE = 0.05
+NIGHT_CLICK_LOG_SAMPLE_RATE = 0.05
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the game context of the record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a record tagged with extra={'sample': rate} with that probability.
+    Untagged records, warnings and errors always pass."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, 'sample', None)
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < rate
+
+
+class MessageOnlyQueueHandler(QueueHandler):
+    """Resolves the message arguments of records that passed the level and
+    sampling checks, but leaves traceback and JSON formatting to the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(level: int = logging.INFO, stream=None) -> QueueListener:
+    """Routes all logging through an in-memory queue. Handler threads only
+    enqueue records; formatting and I/O happen on the listener thread."""
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+
+    queue_handler = MessageOnlyQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def log_context(chat_id: Optional[int], game=None, **extra) -> dict:
+    """Builds the `extra` dict for a record about a game"""
+    context = {'chat_id': chat_id}
+    if game is not None:
+        context['game_id'] = game.id
+        context['phase'] = game.current_phase.value if game.current_phase else None
+    context.update(extra)
+    return context
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import threading
+import time
+
+DEFAULT_LANGUAGE = 'hy'
+MATCH_TARGET_SIZE = 8      # players per matched game
+MATCH_MAX_WAIT = 60        # seconds before a smaller game (>= MIN_PLAYERS) is formed
+MATCHMAKING_INTERVAL = 5   # seconds between matchmaker runs
+
+
+@dataclass
+class QueuedPlayer:
+    telegram_id: int
+    username: str
+    language: str = DEFAULT_LANGUAGE
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class MatchmakingQueue:
+    """FIFO queues of waiting players, one per preferred language.
+
+    Each queue is an OrderedDict keyed by telegram_id, so enqueue, dequeue of
+    the longest-waiting player and cancellation are all O(1)."""
+
+    def __init__(self):
+        self.queues: Dict[str, "OrderedDict[int, QueuedPlayer]"] = {}
+        self.languages: Dict[int, str] = {}  # telegram_id -> queue it waits in
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.languages)
+
+    def __contains__(self, telegram_id: int) -> bool:
+        return telegram_id in self.languages
+
+    def enqueue(self, player: QueuedPlayer) -> bool:
+        with self.lock:
+            if player.telegram_id in self.languages:
+                return False
+            self.queues.setdefault(player.language, OrderedDict())[player.telegram_id] = player
+            self.languages[player.telegram_id] = player.language
+            return True
+
+    def remove(self, telegram_id: int) -> Optional[QueuedPlayer]:
+        with self.lock:
+            language = self.languages.pop(telegram_id, None)
+            if language is None:
+                return None
+            return self.queues[language].pop(telegram_id, None)
+
+    def requeue(self, players: List[QueuedPlayer]) -> None:
+        """Puts players back at the head of their queues, e.g. after a matched
+        game failed to start, without resetting their wait time"""
+        with self.lock:
+            for player in reversed(players):
+                if player.telegram_id in self.languages:
+                    continue
+                queue = self.queues.setdefault(player.language, OrderedDict())
+                queue[player.telegram_id] = player
+                queue.move_to_end(player.telegram_id, last=False)
+                self.languages[player.telegram_id] = player.language
+
+    def _pop_oldest(self, language: str, count: int) -> List[QueuedPlayer]:
+        queue = self.queues[language]
+        players = []
+        for _ in range(min(count, len(queue))):
+            _, player = queue.popitem(last=False)
+            del self.languages[player.telegram_id]
+            players.append(player)
+        return players
+
+    def match(self, min_size: int, target_size: int = MATCH_TARGET_SIZE,
+              max_wait: float = MATCH_MAX_WAIT) -> List[List[QueuedPlayer]]:
+        """Groups waiting players into games. Full games of target_size are
+        formed first; a smaller game of at least min_size is formed once the
+        longest-waiting player in a language has waited max_wait seconds."""
+        now = time.monotonic()
+        groups = []
+        with self.lock:
+            for language, queue in self.queues.items():
+                while len(queue) >= target_size:
+                    groups.append(self._pop_oldest(language, target_size))
+                if len(queue) >= min_size:
+                    oldest = next(iter(queue.values()))
+                    if now - oldest.enqueued_at >= max_wait:
+                        groups.append(self._pop_oldest(language, target_size))
+        return groups
@@ -1,6 +1,7 @@
 # Armenian language messages
 MESSAGES = {
     'game_start': 'Խաղը սկսվում է!',
+    'game_start_failed': 'Խաղը սկսել չհաջողվեց: Փորձեք կրկին /start հրամանով:',
     'night_phase': 'Գիշերն է: Բոլորը քնած են, բացի հատուկ դերեր ունեցողներից:',
     'day_phase': 'Առավոտ է: Քննարկման ժամանակն է:',
     'voting_phase': 'Քվեարկության ժամանակն է: Ընտրեք կասկածյալին:',
@@ -22,6 +23,7 @@ MESSAGES = {
     'player_list': '👥 Խաղացողներ:\n{}',
     'player_left': '{} լքեց խաղը:',
     'game_already_started': 'Խաղն արդեն սկսված է:',
+    'already_in_game': 'Դուք արդեն մեկ այլ խաղի մեջ եք:',
     'error_joining': 'Սխալ միանալիս խաղին:',
 
     # Actions
@@ -46,10 +48,24 @@ MESSAGES = {
 
     # Action results
     'not_night_phase': 'Հիմա գիշերային փուլը չէ:',
+    'not_voting_phase': 'Հիմա քվեարկության փուլը չէ:',
+    'too_many_requests': 'Չափազանց հաճախ եք սեղմում, փորձեք մի փոքր ուշ:',
     'player_not_found': 'Խաղացողը չի գտնվել:',
     'no_night_action': 'Դուք չունեք գիշերային գործողություն:',
     'action_failed': 'Գործողությունը ձախողվել է:',
     'action_successful': 'Գործողությունը հաջողվել է:',
     'cannot_target_self': 'Դուք չեք կարող ընտրել ինքներդ ձեզ:',
     'cannot_target_dead': 'Դուք չեք կարող ընտրել մահացած խաղացողին:',
+
+    # Mafia chat
+    'mafia_chat_message': '🔪 {}: {}',
+    'mafia_chat_night_only': 'Մաֆիայի զրույցը հասանելի է միայն գիշերը:',
+
+    # Matchmaking
+    'queue_joined': 'Դուք հերթում եք: Սպասող խաղացողներ՝ {}',
+    'queue_already_queued': 'Դուք արդեն հերթում եք: Սպասող խաղացողներ՝ {}',
+    'queue_left': 'Դուք դուրս եկաք հերթից:',
+    'queue_not_queued': 'Դուք հերթում չեք:',
+    'queue_already_in_game': 'Դուք արդեն խաղի մեջ եք:',
+    'match_found': 'Խաղը գտնված է! Խաղացողներ:\n{}',
 }
\ No newline at end of file
@@ -1,4 +1,7 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey, Enum, Table
+from sqlalchemy import (
+    create_engine, Column, Integer, BigInteger, String, Boolean, ForeignKey, Enum, Table, DateTime,
+    UniqueConstraint
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import enum
@@ -40,9 +43,11 @@ class ActionType(enum.Enum):
 
 class Player(Base):
     __tablename__ = 'players'
+    __table_args__ = (UniqueConstraint('bot_id', 'telegram_id'),)
 
     id = Column(Integer, primary_key=True)
-    telegram_id = Column(Integer, unique=True)
+    bot_id = Column(BigInteger, nullable=True)  # Бот, через которого играет игрок
+    telegram_id = Column(Integer)
     username = Column(String)
     game_id = Column(Integer, ForeignKey('games.id'))
     current_role = Column(Enum(Role), nullable=True)
@@ -57,12 +62,15 @@ class Player(Base):
 
 class Game(Base):
     __tablename__ = 'games'
+    __table_args__ = (UniqueConstraint('bot_id', 'chat_id'),)
 
     id = Column(Integer, primary_key=True)
-    chat_id = Column(Integer, unique=True)  # ID чата Telegram, где идет игра
+    bot_id = Column(BigInteger, nullable=True)  # Бот, который ведет игру
+    chat_id = Column(BigInteger)  # ID чата Telegram, где идет игра (у виртуальных чатов подбора ниже -10**15)
     status = Column(Enum(GameStatus), default=GameStatus.WAITING)
     current_phase = Column(Enum(GamePhase), nullable=True)
     night_count = Column(Integer, default=0)
+    phase_deadline = Column(DateTime, nullable=True)  # Когда закончится текущая фаза (UTC)
 
     # Отношения
     players = relationship("Player", back_populates="game")
@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from telegram import InlineKeyboardMarkup
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Telegram rejects text messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+MESSAGE_SEPARATOR = "\n\n"
+# Telegram allows each bot about 30 messages per second across all chats
+GLOBAL_SEND_RATE = 30
+SENDER_WORKERS = 8
+
+
+def pack_messages(messages: List[str], limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Joins messages into as few chunks as the length limit allows"""
+    chunks = []
+    current = ""
+    for message in messages:
+        # A single oversized message is split on its own
+        while len(message) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(message[:limit])
+            message = message[limit:]
+
+        if not current:
+            current = message
+        elif len(current) + len(MESSAGE_SEPARATOR) + len(message) <= limit:
+            current += MESSAGE_SEPARATOR + message
+        else:
+            chunks.append(current)
+            current = message
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class ChatOutbox:
+    """Collects messages bound for a chat during a phase transition so they
+    go out as a single message (or as few as the limit allows)."""
+
+    def __init__(self):
+        self.pending: Dict[int, List[str]] = {}
+
+    def queue(self, chat_id: int, text: str) -> None:
+        if text:
+            self.pending.setdefault(chat_id, []).append(text)
+
+    def discard(self, chat_id: int) -> None:
+        self.pending.pop(chat_id, None)
+
+    def take(self, chat_id: int) -> List[str]:
+        """Removes everything queued for the chat, packed into chunks"""
+        return pack_messages(self.pending.pop(chat_id, []))
+
+
+class RateLimiter:
+    """Thread-safe token bucket"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Takes a token if one is available. Returns 0 on success, otherwise
+        the number of seconds until the next token."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def refund(self) -> None:
+        """Returns a token taken by try_acquire for an action that did not happen"""
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def acquire(self) -> None:
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class FanOutSender:
+    """Outbound dispatcher shared by every bot in the process. Messages are
+    sent concurrently by a pool of workers, without exceeding each bot's
+    Telegram send rate. Each chat is always served by the same worker, so a
+    chat receives its messages in order."""
+
+    def __init__(self, rate: float = GLOBAL_SEND_RATE, workers: int = SENDER_WORKERS):
+        self.rate = rate
+        self.limiters: Dict[Optional[str], RateLimiter] = {}  # bot token -> its send rate
+        self.lock = threading.Lock()
+        self.executors = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"fanout-{i}") for i in range(workers)
+        ]
+
+    def limiter_for(self, bot) -> RateLimiter:
+        # Keyed by token rather than bot.id, which needs a getMe call
+        key = getattr(bot, 'token', None)
+        with self.lock:
+            limiter = self.limiters.get(key)
+            if limiter is None:
+                limiter = self.limiters[key] = RateLimiter(self.rate)
+            return limiter
+
+    def _send(self, bot, chat_id: int, chunks: List[str], reply_markup: Optional[InlineKeyboardMarkup]) -> None:
+        limiter = self.limiter_for(bot)
+        for i, chunk in enumerate(chunks):
+            limiter.acquire()
+            try:
+                bot.send_message(chat_id, chunk, reply_markup=reply_markup if i == len(chunks) - 1 else None)
+            except Exception as e:
+                logger.error("Failed to send message to chat %s: %s", chat_id, e)
+
+    def send(self, bot, chat_id: int, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None) -> None:
+        self.fan_out_chunks(bot, [chat_id], [text], reply_markup)
+
+    def fan_out(self, bot, chat_ids: Iterable[int], text: str) -> None:
+        self.fan_out_chunks(bot, chat_ids, [text])
+
+    def fan_out_chunks(self, bot, chat_ids: Iterable[int], chunks: List[str],
+                       reply_markup: Optional[InlineKeyboardMarkup] = None) -> None:
+        """Sends the chunks to every chat; the reply markup goes with the last one"""
+        if not chunks:
+            return
+        for chat_id in chat_ids:
+            executor = self.executors[chat_id % len(self.executors)]
+            executor.submit(self._send, bot, chat_id, chunks, reply_markup)
+
+    def wait(self) -> None:
+        """Blocks until every message queued so far has been sent"""
+        for future in [executor.submit(lambda: None) for executor in self.executors]:
+            future.result()
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+import threading
+
+PROFILE_CACHE_SIZE = 10000  # player profiles kept in memory per bot
+
+
+@dataclass
+class PlayerProfile:
+    """The part of a Player row a join needs: which row to reuse and what it holds"""
+    player_id: int
+    telegram_id: int
+    username: str
+    game_id: Optional[int]
+
+
+class PlayerProfileCache:
+    """Bounded LRU cache of player profiles keyed by telegram_id.
+
+    Entries are written only after the database commit that produced them
+    succeeded, and dropped when a write fails, so a cached profile always
+    matches a committed row."""
+
+    def __init__(self, max_size: int = PROFILE_CACHE_SIZE):
+        self.max_size = max_size
+        self.profiles: "OrderedDict[int, PlayerProfile]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def get_many(self, telegram_ids: Iterable[int]) -> Dict[int, PlayerProfile]:
+        found = {}
+        with self.lock:
+            for telegram_id in telegram_ids:
+                profile = self.profiles.get(telegram_id)
+                if profile is not None:
+                    self.profiles.move_to_end(telegram_id)
+                    found[telegram_id] = profile
+        return found
+
+    def put_many(self, profiles: Iterable[PlayerProfile]) -> None:
+        with self.lock:
+            for profile in profiles:
+                self.profiles[profile.telegram_id] = profile
+                self.profiles.move_to_end(profile.telegram_id)
+            while len(self.profiles) > self.max_size:
+                self.profiles.popitem(last=False)
+
+    def invalidate(self, telegram_ids: Iterable[int]) -> None:
+        with self.lock:
+            for telegram_id in telegram_ids:
+                self.profiles.pop(telegram_id, None)
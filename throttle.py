@@ -0,0 +1,114 @@
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+import functools
+import threading
+import time
+import logging
+from telegram import Update
+from telegram.ext import CallbackContext
+from messages import MESSAGES
+from outbox import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Per-user buttons: a short burst, then one press per second
+USER_CLICK_RATE = 1.0
+USER_CLICK_BURST = 5
+# Per-chat buttons: enough for a full 20-player lobby joining at once
+CHAT_CLICK_RATE = 10.0
+CHAT_CLICK_BURST = 30
+BUCKET_IDLE_TTL = 10 * 60  # seconds before an unused bucket is dropped
+
+
+class AdmissionController:
+    """Admission layer in front of the callback query handlers.
+
+    Presses are rejected cheaply, before any database work or game lock, when
+    the user's or the chat's token bucket is empty. A press identical to the
+    same user's previous press in the same phase is acknowledged without
+    reaching the handler. A different press passes through and replaces the
+    earlier choice, so the last click wins.
+
+    Guarded handlers return True when the press took effect; only those
+    presses are remembered for duplicate suppression."""
+
+    def __init__(self, phase_key: Callable[[Update], Hashable],
+                 chat_key: Optional[Callable[[Update], int]] = None):
+        self.phase_key = phase_key
+        # Buttons pressed in private chats count against the game chat they belong to
+        self.chat_key = chat_key or (lambda update: update.effective_chat.id)
+        self.user_buckets: Dict[int, RateLimiter] = {}
+        self.chat_buckets: Dict[int, RateLimiter] = {}
+        self.last_clicks: Dict[int, Tuple[Hashable, str]] = {}  # user_id -> (phase key, callback data)
+        self.last_seen: Dict[int, float] = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, buckets: Dict[int, RateLimiter], key: int, rate: float, burst: float) -> RateLimiter:
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = RateLimiter(rate, burst)
+        return bucket
+
+    def admit(self, update: Update) -> str:
+        """Returns 'ok', 'duplicate' or 'throttled'"""
+        query = update.callback_query
+        user_id = query.from_user.id
+        chat_id = self.chat_key(update)
+        phase = self.phase_key(update)
+
+        with self.lock:
+            self.last_seen[user_id] = time.monotonic()
+            if self.last_clicks.get(user_id) == (phase, query.data):
+                return 'duplicate'
+            user_bucket = self._bucket(self.user_buckets, user_id, USER_CLICK_RATE, USER_CLICK_BURST)
+            chat_bucket = self._bucket(self.chat_buckets, chat_id, CHAT_CLICK_RATE, CHAT_CLICK_BURST)
+
+        if user_bucket.try_acquire():
+            return 'throttled'
+        if chat_bucket.try_acquire():
+            # The press did not happen, so the user keeps their token
+            user_bucket.refund()
+            return 'throttled'
+        return 'ok'
+
+    def remember(self, update: Update, phase: Hashable) -> None:
+        """Records an accepted press; the same press in the same phase is then a duplicate"""
+        query = update.callback_query
+        with self.lock:
+            self.last_clicks[query.from_user.id] = (phase, query.data)
+
+    def forget(self, user_ids: Iterable[int]) -> None:
+        """Drops remembered presses whose effect was undone, so they can be pressed again"""
+        with self.lock:
+            for user_id in user_ids:
+                self.last_clicks.pop(user_id, None)
+
+    def guard(self, handler: Callable[[Update, CallbackContext], None]) -> Callable[[Update, CallbackContext], None]:
+        @functools.wraps(handler)
+        def guarded(update: Update, context: CallbackContext) -> None:
+            decision = self.admit(update)
+            if decision == 'ok':
+                # The handler may advance the phase, so take the key before it runs
+                phase = self.phase_key(update)
+                accepted = handler(update, context)
+                if accepted:
+                    self.remember(update, phase)
+                return accepted
+            try:
+                if decision == 'throttled':
+                    update.callback_query.answer(MESSAGES['too_many_requests'])
+                else:
+                    update.callback_query.answer()
+            except Exception as e:
+                logger.error("Failed to answer %s callback: %s", decision, e)
+        return guarded
+
+    def prune(self, context: CallbackContext = None) -> None:
+        """Drops state of users idle for BUCKET_IDLE_TTL; runs as a periodic job"""
+        cutoff = time.monotonic() - BUCKET_IDLE_TTL
+        with self.lock:
+            for user_id in [uid for uid, seen in self.last_seen.items() if seen < cutoff]:
+                del self.last_seen[user_id]
+                self.user_buckets.pop(user_id, None)
+                self.last_clicks.pop(user_id, None)
+            for chat_id in [cid for cid, bucket in self.chat_buckets.items() if bucket.updated < cutoff]:
+                del self.chat_buckets[chat_id]